@@ -2,13 +2,22 @@
 Charsetrs - A Python library with Rust bindings for charset detection
 """
 
-from dataclasses import dataclass
+import functools
+import os
+import stat
+import sys
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 from pathlib import Path
+from types import MappingProxyType
 from typing import Literal
 
 from charsetrs._internal import (
     analyse_from_path_stream as _analyse_from_path_stream_internal,
 )
+from charsetrs._internal import (
+    analyse_many as _analyse_many_internal,
+)
 from charsetrs._internal import (
     normalize_file_stream as _normalize_file_stream_internal,
 )
@@ -17,13 +26,94 @@ __version__ = "0.2.0"
 
 __all__ = [
     "analyse",
+    "analyse_many",
+    "clear_cache",
     "normalize",
     "AnalysisResult",
     "__version__",
 ]
 
 
-@dataclass(frozen=True)
+def _max_sample_size_from_env() -> int | None:
+    """Read the default sampling cap from the CHARSETRS_MAX_SAMPLE environment variable, if set."""
+    value = os.environ.get("CHARSETRS_MAX_SAMPLE")
+    if not value:
+        return None
+
+    try:
+        max_sample_size = int(value)
+    except ValueError:
+        max_sample_size = 0
+    if max_sample_size <= 0:
+        raise ValueError(f"CHARSETRS_MAX_SAMPLE must be a positive number of bytes, got {value!r}")
+    return max_sample_size
+
+
+# Default cap on the number of bytes sampled for detection, tunable through the environment
+_DEFAULT_MAX_SAMPLE_SIZE = _max_sample_size_from_env()
+
+_DASH_TO_UNDER = str.maketrans("-", "_")
+
+# Common encoding aliases mapped to their canonical name (keys are already normalized)
+_ENCODING_ALIASES = MappingProxyType(
+    {
+        "utf8": "utf_8",
+        "utf16": "utf_16",
+        "iso_8859_1": "latin_1",
+        "latin1": "latin_1",
+        "windows_1252": "cp1252",
+    }
+)
+
+# Canonical encodings that decode every byte below 0x80 as ASCII
+_ASCII_COMPATIBLE_ENCODINGS = frozenset(
+    {
+        "ascii",
+        "utf_8",
+        "latin_1",
+        "cp1250",
+        "cp1251",
+        "cp1252",
+        "cp1253",
+        "cp1254",
+        "cp1255",
+        "cp1256",
+        "cp949",
+        "euc_jp",
+        "euc_kr",
+        "gb2312",
+        "gbk",
+        "big5",
+        "koi8_r",
+        "koi8_u",
+        "mac_roman",
+        "mac_cyrillic",
+    }
+)
+
+_ASCII_SCAN_CHUNK_SIZE = 1024 * 1024
+
+# Bytes read from the start of a file to sniff its newline style when detection is skipped
+_NEWLINE_SCAN_SIZE = 8 * 1024
+
+# Largest file the BOM and pure ASCII prechecks read in Python before deferring to the Rust detector
+_PRECHECK_MAX_SIZE = 1024 * 1024
+
+# Bytes the prechecks look at before reading the rest of the file, enough to reject most non-ASCII text
+_PRECHECK_HEAD_SIZE = 64 * 1024
+
+# Byte order marks resolved by the Rust detector, with the encoding names it reports for them
+_BOM_ENCODINGS = (
+    (b"\xef\xbb\xbf", "utf_8"),
+    (b"\xff\xfe", "utf_16le"),
+    (b"\xfe\xff", "utf_16be"),
+)
+
+# A UTF-32LE BOM starts with the UTF-16LE one, but no supported encoding decodes UTF-32
+_UTF32LE_BOM = b"\xff\xfe\x00\x00"
+
+
+@dataclass(frozen=True, slots=True)
 class AnalysisResult:
     """Result of file analysis containing encoding and newline style information."""
 
@@ -31,11 +121,27 @@ class AnalysisResult:
     newlines: Literal["LF", "CRLF", "CR"]
 
 
+@dataclass(frozen=True, slots=True)
+class _CandidateEncodings:
+    """
+    Candidate encodings as the caller named them, compared and hashed by their canonical names.
+
+    The canonical names key the analysis cache and are matched against precheck results, while
+    the original names are passed to the Rust detector, which also accepts WHATWG labels such
+    as 'windows-874' that do not survive canonicalization.
+    """
+
+    canonical: frozenset[str]
+    names: tuple[str, ...] = field(compare=False)
+
+
 def analyse(
     file_path: str | Path,
     min_sample_size: int = 1024 * 1024,
     percentage_sample_size: float = 0.1,
-    max_sample_size: int | None = None,
+    max_sample_size: int | None = _DEFAULT_MAX_SAMPLE_SIZE,
+    min_confidence: float | None = None,
+    candidate_encodings: Iterable[str] | None = None,
 ) -> AnalysisResult:
     """
     Analyse the encoding and newline style of a file.
@@ -51,18 +157,39 @@ def analyse(
         percentage_sample_size: Percentage of file to sample (0.0 to 1.0).
                                Default is 0.1 (10% of the file).
         max_sample_size: Optional maximum number of bytes to sample.
-                        Default is None (no maximum limit).
+                        Default is None (no maximum limit), or the value of the
+                        CHARSETRS_MAX_SAMPLE environment variable when it is set.
                         Can be used to cap memory usage for very large files.
+        min_confidence: Optional confidence threshold (0.0 to 1.0). When the initial
+                       statistical guess is at least this confident, it is used as is
+                       and the other candidate encodings are not scored.
+                       Default is None (always score every candidate).
+        candidate_encodings: Optional encoding names (e.g. ['utf-8', 'cp1252']) to
+                            restrict detection to. Both WHATWG labels and Python codec
+                            names are accepted. Only these encodings are scored,
+                            which is faster and avoids unlikely guesses.
+                            Default is None (score every supported encoding).
 
     Returns:
         AnalysisResult: Object containing encoding and newlines information
 
+    Raises:
+        TypeError: If candidate_encodings is a single string instead of an iterable of names
+        ValueError: If candidate_encodings is empty or names an unsupported encoding
+
     Sampling Strategy:
         The function reads samples strategically without loading the entire file:
         - 35% from the beginning of the file
         - 15% from the end of the file
         - 50% distributed in chunks throughout the middle
 
+    Caching:
+        Results are cached per file (path, device, inode, modification time and size)
+        and sampling parameters, so analysing an unchanged file again does not re-read it.
+        A file rewritten in place with the same size within the filesystem's timestamp
+        granularity keeps its key and returns the stale result; call clear_cache() after
+        such writes.
+
     Examples:
         >>> import charsetrs
         >>> result = charsetrs.analyse("file.txt")
@@ -79,49 +206,234 @@ def analyse(
         >>> print(result.encoding)
         'windows_1252'
     """
-    if isinstance(file_path, str):
-        file_path = Path(file_path)
+    path, stat_result = _stat_file(file_path)
+    return _cached_analyse(
+        path,
+        _file_identity(stat_result),
+        min_sample_size,
+        percentage_sample_size,
+        max_sample_size,
+        min_confidence,
+        _candidate_set(candidate_encodings),
+    )
+
+
+def analyse_many(
+    file_paths: Iterable[str | Path],
+    min_sample_size: int = 1024 * 1024,
+    percentage_sample_size: float = 0.1,
+    max_sample_size: int | None = _DEFAULT_MAX_SAMPLE_SIZE,
+    min_confidence: float | None = None,
+    candidate_encodings: Iterable[str] | None = None,
+) -> list[AnalysisResult]:
+    """
+    Analyse the encoding and newline style of many files in parallel.
+
+    The files are analysed concurrently in Rust with the GIL released, which is much
+    faster than calling analyse() in a loop when scanning large numbers of files.
+    Results are returned in the same order as the input paths and are not cached.
+
+    Args:
+        file_paths: Paths to the files to analyse (strings or Path objects)
+        min_sample_size: Minimum number of bytes to sample per file. Default is 1MB.
+        percentage_sample_size: Percentage of each file to sample (0.0 to 1.0). Default is 0.1.
+        max_sample_size: Optional maximum number of bytes to sample per file.
+        min_confidence: Optional confidence threshold, see analyse().
+        candidate_encodings: Optional encoding names to restrict detection to, see analyse().
+
+    Returns:
+        list[AnalysisResult]: One result per input path
+
+    Examples:
+        >>> import charsetrs
+        >>> results = charsetrs.analyse_many(["a.txt", "b.txt"])
+        >>> [result.encoding for result in results]
+        ['utf_8', 'cp1252']
+    """
+    paths = [_stat_file(file_path)[0] for file_path in file_paths]
+    candidates = _candidate_set(candidate_encodings)
+    rust_results = _analyse_many_internal(
+        paths,
+        min_sample_size,
+        percentage_sample_size,
+        max_sample_size,
+        min_confidence,
+        None if candidates is None else list(candidates.names),
+    )
+    return [_from_rust_result(rust_result) for rust_result in rust_results]
+
+
+def clear_cache() -> None:
+    """
+    Discard every cached analyse() result.
 
-    file_path = file_path.absolute()
-    if file_path.is_dir():
-        raise ValueError(f"Provided path '{file_path}' is a directory, expected a file path.")
+    Use it when files may have been rewritten without their size or modification time
+    changing, e.g. on filesystems with coarse timestamps, so the next analyse() call
+    reads them again.
+    """
+    _cached_analyse.cache_clear()
+
+
+def _stat_file(file_path: str | Path) -> tuple[str, os.stat_result]:
+    """Return the absolute path of an existing file and its stat result, using a single stat() call."""
+    path = os.path.abspath(file_path)
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f"File '{path}' does not exist.") from e
+
+    if stat.S_ISDIR(stat_result.st_mode):
+        raise ValueError(f"Provided path '{path}' is a directory, expected a file path.")
+
+    return path, stat_result
 
-    if file_path.exists() is False:
-        raise FileNotFoundError(f"File '{file_path}' does not exist.")
+
+def _file_identity(stat_result: os.stat_result) -> tuple[int, int, int, int]:
+    """Build the part of the analysis cache key that changes whenever the file is rewritten."""
+    return (stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached_analyse(
+    file_path: str,
+    identity: tuple[int, int, int, int],
+    min_sample_size: int,
+    percentage_sample_size: float,
+    max_sample_size: int | None,
+    min_confidence: float | None,
+    candidate_encodings: _CandidateEncodings | None,
+) -> AnalysisResult:
+    """
+    Run the Rust detector, caching results per file identity and sampling parameters.
+
+    The file identity (device, inode, modification time and size) is only part of the
+    cache key; a file that is replaced or modified gets a new key. Symlinks are keyed by
+    their target's metadata since it comes from a stat() call that follows links.
+    """
+    file_size = identity[3]
+    precheck_result = _analyse_small_file(file_path, file_size, min_sample_size)
+    if precheck_result is not None and (
+        candidate_encodings is None or _canonical_encoding(precheck_result.encoding) in candidate_encodings.canonical
+    ):
+        return precheck_result
 
     rust_result = _analyse_from_path_stream_internal(
-        file_path.as_posix(), min_sample_size, percentage_sample_size, max_sample_size
+        file_path,
+        min_sample_size,
+        percentage_sample_size,
+        max_sample_size,
+        min_confidence,
+        None if candidate_encodings is None else list(candidate_encodings.names),
     )
+    return _from_rust_result(rust_result)
+
+
+def _candidate_set(candidate_encodings: Iterable[str] | None) -> _CandidateEncodings | None:
+    """Collect the caller's candidate encodings into a hashable value usable as a cache key."""
+    if candidate_encodings is None:
+        return None
+    if isinstance(candidate_encodings, str):
+        # A bare string is itself an iterable of one-character names
+        raise TypeError(f"candidate_encodings must be an iterable of names, got the string {candidate_encodings!r}.")
+    names = tuple(dict.fromkeys(candidate_encodings))
+    if not names:
+        raise ValueError("candidate_encodings must name at least one encoding.")
+    return _CandidateEncodings(frozenset(_canonical_encoding(name) for name in names), names)
+
+
+def _analyse_small_file(file_path: str, file_size: int, min_sample_size: int) -> AnalysisResult | None:
+    """
+    Resolve a small file starting with a BOM or holding pure ASCII without calling into Rust.
+
+    Only files the Rust detector would sample in full are checked, so the newline style is
+    read from the same bytes. A UTF-8 or UTF-16 BOM decides the encoding outright (a UTF-32LE
+    BOM, which begins with the UTF-16LE one, is left to Rust), and ASCII content always
+    resolves to UTF-8 unless it has NUL bytes, which are left to Rust's UTF-16 pattern check.
+    Returns None when the Rust detector is needed.
+    """
+    if not 0 < file_size <= min(min_sample_size, _PRECHECK_MAX_SIZE):
+        return None
+
+    with open(file_path, "rb") as f:
+        head = f.read(_PRECHECK_HEAD_SIZE)
+        bom_encoding = None
+        if not head.startswith(_UTF32LE_BOM):
+            bom_encoding = next((encoding for bom, encoding in _BOM_ENCODINGS if head.startswith(bom)), None)
+
+        # Only read the rest of the file once its head can still be resolved here
+        if bom_encoding is None and not _is_plain_ascii(head):
+            return None
+        rest = f.read(file_size - len(head))
+
+    if bom_encoding is None and not _is_plain_ascii(rest):
+        return None
+    return AnalysisResult(encoding=bom_encoding or "utf_8", newlines=_detect_newlines(head + rest))
+
+
+def _is_plain_ascii(data: bytes) -> bool:
+    """Check that bytes are ASCII without NUL bytes, which may be UTF-16 text."""
+    return data.isascii() and b"\0" not in data
+
+
+def _from_rust_result(rust_result) -> AnalysisResult:
+    """
+    Convert a result returned by the Rust extension into an AnalysisResult.
+
+    Only a handful of distinct encoding and newline names ever come back, so they are
+    interned: results from many files share the same string objects and comparing them
+    is usually an identity check.
+    """
     return AnalysisResult(
-        encoding=rust_result.encoding,
-        newlines=rust_result.newlines,
+        encoding=sys.intern(rust_result.encoding),
+        newlines=sys.intern(rust_result.newlines),
     )
 
 
+def _canonical_encoding(encoding: str) -> str:
+    """Normalize an encoding name and resolve it to its canonical alias."""
+    normalized = encoding.lower().translate(_DASH_TO_UNDER)
+    return _ENCODING_ALIASES.get(normalized, normalized)
+
+
 def _encodings_are_equivalent(source_enc: str, target_enc: str) -> bool:
     """Check if two encoding names are equivalent, considering common aliases."""
-    source_normalized = source_enc.lower().replace("-", "_")
-    target_normalized = target_enc.lower().replace("-", "_")
-
-    if source_normalized == target_normalized:
-        return True
-
-    # Map common encoding aliases
-    encoding_aliases = {
-        "utf_8": ["utf8"],
-        "utf_16": ["utf16"],
-        "latin_1": ["iso_8859_1", "latin1"],
-        "cp1252": ["windows_1252"],
-    }
+    return _canonical_encoding(source_enc) == _canonical_encoding(target_enc)
 
-    # Check if both encodings are aliases of the same canonical encoding
-    for canonical, aliases in encoding_aliases.items():
-        # Include canonical name in the set of valid aliases
-        all_aliases = {canonical, *aliases}
-        if source_normalized in all_aliases and target_normalized in all_aliases:
-            return True
 
-    return False
+def _detect_newlines(sample: bytes) -> Literal["LF", "CRLF", "CR"]:
+    """
+    Detect the newline style of a byte sample, preferring CRLF, then LF, then CR like the Rust detector.
+
+    Without a CR byte the answer is LF whether or not the sample has newlines, so the common
+    case is a single memchr sweep; the two-byte CRLF search only runs when a CR exists and
+    stops at the first match.
+    """
+    if b"\r" not in sample:
+        return "LF"
+    if b"\r\n" in sample:
+        return "CRLF"
+    if b"\n" in sample:
+        return "LF"
+    return "CR"
+
+
+def _is_ascii_file(file_path: str) -> bool:
+    """Check whether a file contains only ASCII bytes, stopping at the first non-ASCII chunk."""
+    with open(file_path, "rb") as f:
+        while chunk := f.read(_ASCII_SCAN_CHUNK_SIZE):
+            if not chunk.isascii():
+                return False
+    return True
+
+
+def _is_ascii_noop(file_path: str, source_enc: str, target_enc: str) -> bool:
+    """Check whether converting between the encodings leaves the file unchanged because it is pure ASCII."""
+    # Pure ASCII content is byte-identical in any ASCII-compatible encoding
+    return (
+        _canonical_encoding(source_enc) in _ASCII_COMPATIBLE_ENCODINGS
+        and _canonical_encoding(target_enc) in _ASCII_COMPATIBLE_ENCODINGS
+        and _is_ascii_file(file_path)
+    )
 
 
 def normalize(
@@ -130,11 +442,16 @@ def normalize(
     newlines: Literal["LF", "CRLF", "CR"] = "LF",
     min_sample_size: int = 1024 * 1024,
     percentage_sample_size: float = 0.1,
-    max_sample_size: int | None = None,
+    max_sample_size: int | None = _DEFAULT_MAX_SAMPLE_SIZE,
+    min_confidence: float | None = None,
+    source_encoding: str | None = None,
 ):
     """
     Normalize a file by converting its encoding and newline style in-place.
 
+    When the source encoding is already known, pass it as `source_encoding` to skip
+    encoding detection entirely; only the first few KB are read to sniff the newlines.
+
     This function uses streaming to process files efficiently, making it suitable
     for very large files (10GB+) with constant memory usage. The file is modified
     in-place using a temporary file and atomic rename.
@@ -145,7 +462,12 @@ def normalize(
         newlines: Target newline style ('LF', 'CRLF', or 'CR'). Default: 'LF'
         min_sample_size: Minimum number of bytes to sample. Default is 1MB.
         percentage_sample_size: Percentage of file to sample (0.0 to 1.0). Default is 0.1 (10%).
-        max_sample_size: Optional maximum number of bytes to sample. Default is None.
+        max_sample_size: Optional maximum number of bytes to sample.
+                        Default is None, or the CHARSETRS_MAX_SAMPLE environment variable.
+        min_confidence: Optional confidence threshold that skips scoring the other
+                       candidate encodings once reached. Default is None.
+        source_encoding: Optional encoding of the input file. When given, detection is
+                        skipped and the sampling parameters are ignored. Default is None.
 
     Raises:
         IOError: If file cannot be read or written
@@ -163,40 +485,54 @@ def normalize(
         >>> charsetrs.normalize("large.txt", encoding="utf-8", newlines="LF",
         ...                    min_sample_size=2*1024*1024,
         ...                    percentage_sample_size=0.05)
+
+        >>> # Skip detection when the source encoding is known
+        >>> charsetrs.normalize("export.csv", encoding="utf-8", source_encoding="cp1252")
     """
     # Validate inputs
-    if isinstance(file_path, str):
-        file_path = Path(file_path)
-
-    file_path = file_path.absolute()
-    if file_path.is_dir():
-        raise ValueError(f"Provided path '{file_path}' is a directory, expected a file path.")
-
-    if not file_path.exists():
-        raise FileNotFoundError(f"File '{file_path}' does not exist.")
+    path, stat_result = _stat_file(file_path)
 
     # Check if normalization is needed
-    result = analyse(file_path, min_sample_size, percentage_sample_size, max_sample_size)
-
-    # Check if encodings are equivalent and newlines match
-    if _encodings_are_equivalent(result.encoding, encoding) and result.newlines == newlines:
+    if source_encoding is None:
+        result = _cached_analyse(
+            path,
+            _file_identity(stat_result),
+            min_sample_size,
+            percentage_sample_size,
+            max_sample_size,
+            min_confidence,
+            None,
+        )
+    else:
+        # The source encoding is known, so only the newline style needs to be sniffed
+        with open(path, "rb") as f:
+            head = f.read(_NEWLINE_SCAN_SIZE)
+        result = AnalysisResult(encoding=source_encoding, newlines=_detect_newlines(head))
+
+    # Check if newlines match and the encoding change would leave the bytes as they are
+    if result.newlines == newlines and (
+        _encodings_are_equivalent(result.encoding, encoding) or _is_ascii_noop(path, result.encoding, encoding)
+    ):
         # No normalization needed
         return
 
     # Create temporary output file in the same directory for atomic rename
-    temp_output = file_path.parent / f".{file_path.name}.tmp"
+    directory, name = os.path.split(path)
+    temp_output = os.path.join(directory, f".{name}.tmp")
 
     try:
         # Call Rust streaming normalize function
         try:
             _normalize_file_stream_internal(
-                file_path.as_posix(),
-                temp_output.as_posix(),
+                path,
+                temp_output,
                 encoding,
                 newlines,
                 min_sample_size,
                 percentage_sample_size,
                 max_sample_size,
+                # Reuse the detection above instead of analysing the file a second time
+                result.encoding,
             )
         except OSError as e:
             # Convert OSError from Rust to ValueError for invalid newlines
@@ -205,22 +541,11 @@ def normalize(
                 raise ValueError(error_msg) from e
             raise
 
-        # Create backup of original file
-        backup_path = file_path.with_suffix(file_path.suffix + ".bak")
-        file_path.rename(backup_path)
-
-        try:
-            # Atomically replace original with normalized version
-            temp_output.rename(file_path)
-            # Remove backup if successful
-            backup_path.unlink()
-        except Exception:
-            # Restore original file if rename failed
-            backup_path.rename(file_path)
-            raise
+        # Atomically replace original with normalized version (single rename, no backup needed)
+        os.replace(temp_output, path)
 
     except Exception:
         # Clean up temporary file if it exists
-        if temp_output.exists():
-            temp_output.unlink()
+        if os.path.exists(temp_output):
+            os.unlink(temp_output)
         raise
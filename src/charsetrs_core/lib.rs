@@ -1,11 +1,12 @@
-use pyo3::exceptions::PyIOError;
+use pyo3::exceptions::{PyIOError, PyValueError};
 use pyo3::prelude::*;
+use rayon::prelude::*;
 use std::fs::File;
-use std::io::{BufReader, BufWriter, Read, Seek, SeekFrom, Write};
+use std::io::{BufWriter, Read, Seek, SeekFrom, Write};
 use std::path::Path;
 
 // Constants for memory control
-const CHUNK_SIZE: usize = 8192; // 8KB per chunk
+const CHUNK_SIZE: usize = 64 * 1024; // 64KB per chunk
 
 // Sampling distribution percentages
 const HEAD_PERCENTAGE: f64 = 0.35; // 35% from beginning
@@ -14,6 +15,9 @@ const TAIL_PERCENTAGE: f64 = 0.15; // 15% from end
 const MIDDLE_PERCENTAGE: f64 = 0.50; // 50% from middle (kept for documentation; calculated as sample_size - head_size - tail_size)
 const MIDDLE_CHUNK_PERCENTAGE: f64 = 0.05; // Each middle chunk is 5% of sample
 
+// A UTF-32LE byte order mark starts with the UTF-16LE one
+const UTF32LE_BOM: [u8; 4] = [0xFF, 0xFE, 0x00, 0x00];
+
 // Normalize encoding name to Python codec format
 fn normalize_encoding_name(encoding: &str) -> String {
     let normalized = encoding.to_lowercase().replace("-", "_");
@@ -32,6 +36,7 @@ fn normalize_encoding_name(encoding: &str) -> String {
         "windows_1254" | "cp_1254" => "cp1254".to_string(),
         "windows_1250" | "cp_1250" => "cp1250".to_string(),
         "windows_949" | "cp_949" => "cp949".to_string(),
+        "windows_874" | "cp_874" => "cp874".to_string(),
         "shift_jis" | "shift_jis_2004" => "shift_jis".to_string(),
         "euc_jp" | "euc-jp" => "euc_jp".to_string(),
         "euc_kr" | "euc-kr" => "euc_kr".to_string(),
@@ -67,36 +72,24 @@ impl AnalysisResult {
     }
 }
 
+// Newline kinds seen in a buffer, tracked per (previous, current) byte pair
+#[derive(Default)]
+struct NewlineFlags {
+    crlf: bool,
+    lf_only: bool,
+    cr_only: bool,
+}
+
 // Detect newline style from buffer
 fn detect_newline_style(buffer: &[u8]) -> &'static str {
-    let mut has_crlf = false;
-    let mut has_lf_only = false;
-    let mut has_cr_only = false;
-
-    let mut i = 0;
-    while i < buffer.len() {
-        if buffer[i] == b'\r' {
-            if i + 1 < buffer.len() && buffer[i + 1] == b'\n' {
-                has_crlf = true;
-                i += 2;
-            } else {
-                has_cr_only = true;
-                i += 1;
-            }
-        } else if buffer[i] == b'\n' {
-            has_lf_only = true;
-            i += 1;
-        } else {
-            i += 1;
-        }
-    }
+    let flags = scan_newlines(buffer);
 
     // Prioritize CRLF if found (Windows style)
-    if has_crlf {
+    if flags.crlf {
         "CRLF"
-    } else if has_lf_only {
+    } else if flags.lf_only {
         "LF"
-    } else if has_cr_only {
+    } else if flags.cr_only {
         "CR"
     } else {
         // Default to LF if no newlines found
@@ -104,32 +97,193 @@ fn detect_newline_style(buffer: &[u8]) -> &'static str {
     }
 }
 
+// Classify every newline in the buffer, stopping at the first CRLF since it
+// takes priority over everything else
+fn scan_newlines(buffer: &[u8]) -> NewlineFlags {
+    let mut flags = NewlineFlags::default();
+    let Some(&last) = buffer.last() else {
+        return flags;
+    };
+
+    // The first byte has no predecessor and the last byte has no successor
+    flags.lf_only = buffer[0] == b'\n';
+
+    #[cfg(target_arch = "x86_64")]
+    let start = scan_newline_pairs_sse2(buffer, &mut flags);
+    #[cfg(target_arch = "aarch64")]
+    let start = scan_newline_pairs_neon(buffer, &mut flags);
+    #[cfg(not(any(target_arch = "x86_64", target_arch = "aarch64")))]
+    let start = 1;
+
+    if !flags.crlf {
+        scan_newline_pairs_scalar(buffer, start, &mut flags);
+    }
+    if !flags.crlf && last == b'\r' {
+        flags.cr_only = true;
+    }
+    flags
+}
+
+// Check the byte pairs (buffer[j - 1], buffer[j]) for j in start..buffer.len()
+fn scan_newline_pairs_scalar(buffer: &[u8], start: usize, flags: &mut NewlineFlags) {
+    for j in start.max(1)..buffer.len() {
+        match (buffer[j - 1], buffer[j]) {
+            (b'\r', b'\n') => {
+                flags.crlf = true;
+                return;
+            }
+            (b'\r', _) => flags.cr_only = true,
+            (_, b'\n') => flags.lf_only = true,
+            _ => {}
+        }
+    }
+}
+
+// Check byte pairs 16 at a time by comparing each block against the same
+// block shifted back by one byte. Returns the first pair index left unchecked.
+#[cfg(target_arch = "x86_64")]
+fn scan_newline_pairs_sse2(buffer: &[u8], flags: &mut NewlineFlags) -> usize {
+    use std::arch::x86_64::*;
+
+    let mut j = 1;
+    // SAFETY: SSE2 is part of the x86_64 baseline, and both unaligned loads
+    // stay within buffer[j - 1..j + 16] which the loop condition keeps in bounds
+    unsafe {
+        let cr = _mm_set1_epi8(b'\r' as i8);
+        let lf = _mm_set1_epi8(b'\n' as i8);
+        let mut lf_only = _mm_setzero_si128();
+        let mut cr_only = _mm_setzero_si128();
+        while j + 16 <= buffer.len() {
+            let prev = _mm_loadu_si128(buffer.as_ptr().add(j - 1) as *const __m128i);
+            let cur = _mm_loadu_si128(buffer.as_ptr().add(j) as *const __m128i);
+            let prev_cr = _mm_cmpeq_epi8(prev, cr);
+            let cur_lf = _mm_cmpeq_epi8(cur, lf);
+            if _mm_movemask_epi8(_mm_and_si128(prev_cr, cur_lf)) != 0 {
+                flags.crlf = true;
+                return j;
+            }
+            lf_only = _mm_or_si128(lf_only, _mm_andnot_si128(prev_cr, cur_lf));
+            cr_only = _mm_or_si128(cr_only, _mm_andnot_si128(cur_lf, prev_cr));
+            j += 16;
+        }
+        flags.lf_only |= _mm_movemask_epi8(lf_only) != 0;
+        flags.cr_only |= _mm_movemask_epi8(cr_only) != 0;
+    }
+    j
+}
+
+#[cfg(target_arch = "aarch64")]
+fn scan_newline_pairs_neon(buffer: &[u8], flags: &mut NewlineFlags) -> usize {
+    use std::arch::aarch64::*;
+
+    let mut j = 1;
+    // SAFETY: NEON is part of the aarch64 baseline, and both unaligned loads
+    // stay within buffer[j - 1..j + 16] which the loop condition keeps in bounds
+    unsafe {
+        let cr = vdupq_n_u8(b'\r');
+        let lf = vdupq_n_u8(b'\n');
+        let mut lf_only = vdupq_n_u8(0);
+        let mut cr_only = vdupq_n_u8(0);
+        while j + 16 <= buffer.len() {
+            let prev = vld1q_u8(buffer.as_ptr().add(j - 1));
+            let cur = vld1q_u8(buffer.as_ptr().add(j));
+            let prev_cr = vceqq_u8(prev, cr);
+            let cur_lf = vceqq_u8(cur, lf);
+            if vmaxvq_u8(vandq_u8(prev_cr, cur_lf)) != 0 {
+                flags.crlf = true;
+                return j;
+            }
+            lf_only = vorrq_u8(lf_only, vbicq_u8(cur_lf, prev_cr));
+            cr_only = vorrq_u8(cr_only, vbicq_u8(prev_cr, cur_lf));
+            j += 16;
+        }
+        flags.lf_only |= vmaxvq_u8(lf_only) != 0;
+        flags.cr_only |= vmaxvq_u8(cr_only) != 0;
+    }
+    j
+}
+
+// Byte class flags for the high half of the byte range, see BYTE_CLASSES
+const CLASS_HIGH: u8 = 1 << 0;
+const CLASS_LOWER_HIGH: u8 = 1 << 1;
+const CLASS_UPPER_HIGH: u8 = 1 << 2;
+const CLASS_ARABIC: u8 = 1 << 3;
+const CLASS_TURKISH: u8 = 1 << 4;
+
+// Lookup table mapping every byte value to its class flags (0 for ASCII)
+const BYTE_CLASSES: [u8; 256] = build_byte_classes();
+
+const fn build_byte_classes() -> [u8; 256] {
+    let mut table = [0u8; 256];
+    let mut b = 0x80;
+    while b < 256 {
+        let mut class = CLASS_HIGH;
+        if b >= 0xC0 && b < 0xE0 {
+            class |= CLASS_LOWER_HIGH;
+        }
+        if b >= 0xE0 {
+            class |= CLASS_UPPER_HIGH;
+        }
+        if b >= 0xC0 && b <= 0xE5 {
+            class |= CLASS_ARABIC;
+        }
+        if b == 0xF0 || b == 0xFD || b == 0xFE {
+            class |= CLASS_TURKISH;
+        }
+        table[b] = class;
+        b += 1;
+    }
+    table
+}
+
+// Byte class counts over a sample, gathered in a single pass
+#[derive(Default)]
+struct ByteClassCounts {
+    high: usize,
+    lower_high: usize,
+    upper_high: usize,
+    arabic: usize,
+    turkish: usize,
+}
+
+impl ByteClassCounts {
+    fn from_buffer(buffer: &[u8]) -> Self {
+        let mut counts = Self::default();
+        // Samples are mostly ASCII, so only classify blocks holding a high byte
+        for block in buffer.chunks(16) {
+            if block.is_ascii() {
+                continue;
+            }
+            for &b in block {
+                let class = BYTE_CLASSES[b as usize];
+                if class == 0 {
+                    continue;
+                }
+                counts.high += 1;
+                counts.lower_high += (class & CLASS_LOWER_HIGH != 0) as usize;
+                counts.upper_high += (class & CLASS_UPPER_HIGH != 0) as usize;
+                counts.arabic += (class & CLASS_ARABIC != 0) as usize;
+                counts.turkish += (class & CLASS_TURKISH != 0) as usize;
+            }
+        }
+        counts
+    }
+}
+
 // Analyze byte patterns to detect likely encoding type
-fn analyze_byte_patterns(buffer: &[u8]) -> Vec<&'static str> {
+fn analyze_byte_patterns(counts: &ByteClassCounts, buffer_len: usize) -> Vec<&'static str> {
     let mut hints = Vec::new();
 
-    // Count byte ranges
-    let high_bytes = buffer.iter().filter(|&&b| b >= 0x80).count();
-    if high_bytes == 0 {
+    if counts.high == 0 {
         return hints; // Pure ASCII
     }
 
-    let total_len = buffer.len() as f32;
+    let total_len = buffer_len as f32;
 
     // Byte distribution analysis
-    let lower_high = buffer.iter().filter(|&&b| b >= 0xC0 && b < 0xE0).count();
-    let upper_high = buffer.iter().filter(|&&b| b >= 0xE0).count();
-    let arabic_specific = buffer.iter().filter(|&&b| b >= 0xC0 && b <= 0xE5).count();
-
-    let lower_ratio = lower_high as f32 / total_len;
-    let upper_ratio = upper_high as f32 / total_len;
-    let arabic_ratio = arabic_specific as f32 / total_len;
-
-    // Turkish specific bytes
-    let turkish_specific = buffer
-        .iter()
-        .filter(|&&b| matches!(b, 0xF0 | 0xFD | 0xFE))
-        .count();
+    let lower_ratio = counts.lower_high as f32 / total_len;
+    let upper_ratio = counts.upper_high as f32 / total_len;
+    let arabic_ratio = counts.arabic as f32 / total_len;
 
     // Mac Cyrillic has very high concentration (>60%) in upper range (0xE0-0xFF)
     // while Arabic spreads more evenly
@@ -141,7 +295,8 @@ fn analyze_byte_patterns(buffer: &[u8]) -> Vec<&'static str> {
         hints.push("likely_arabic");
     }
 
-    if turkish_specific >= 2 {
+    // Turkish specific bytes
+    if counts.turkish >= 2 {
         hints.push("likely_turkish");
     }
 
@@ -280,12 +435,15 @@ fn calculate_sample_size(
 
 /// Read strategic samples from file without loading entire file into memory
 /// Returns a buffer containing samples from head, tail, and middle sections
+///
+/// Every section is read straight into a single buffer preallocated to the sample size,
+/// so no intermediate per-section buffers are allocated or copied.
 fn read_strategic_sample(
-    reader: &mut BufReader<File>,
+    reader: &mut File,
     file_size: u64,
     sample_size: usize,
 ) -> std::io::Result<Vec<u8>> {
-    let mut buffer = Vec::new();
+    let mut buffer = Vec::with_capacity(sample_size);
 
     // For very small files or when sample >= file size, read entire file
     if sample_size >= file_size as usize {
@@ -302,18 +460,16 @@ fn read_strategic_sample(
     let middle_chunk_size = (sample_size as f64 * MIDDLE_CHUNK_PERCENTAGE) as usize;
     let num_middle_chunks = (middle_total_size as f64 / middle_chunk_size as f64).ceil() as usize;
 
-    // Read head section (35% from beginning)
-    let mut head_buffer = vec![0u8; head_size];
-    reader.seek(SeekFrom::Start(0))?;
-    let head_read = reader.read(&mut head_buffer)?;
-    buffer.extend_from_slice(&head_buffer[..head_read]);
+    // Collect every (position, length) section to sample, starting with the head (35% from beginning)
+    let mut sections = Vec::with_capacity(num_middle_chunks + 2);
+    sections.push((0, head_size));
 
     // Calculate middle section boundaries (between head and tail)
     let middle_start = head_size as u64;
     let middle_end = file_size.saturating_sub(tail_size as u64);
     let middle_length = middle_end.saturating_sub(middle_start);
 
-    // Read middle chunks distributed uniformly
+    // Middle chunks distributed uniformly
     if middle_length > 0 && num_middle_chunks > 0 {
         for i in 0..num_middle_chunks {
             // Calculate position for this chunk, distributed uniformly using floating-point arithmetic
@@ -326,45 +482,178 @@ fn read_strategic_sample(
                 middle_chunk_size.min((middle_end.saturating_sub(chunk_position)) as usize);
 
             if bytes_to_read > 0 {
-                let mut chunk_buffer = vec![0u8; bytes_to_read];
-                reader.seek(SeekFrom::Start(chunk_position))?;
-                let chunk_read = reader.read(&mut chunk_buffer)?;
-                buffer.extend_from_slice(&chunk_buffer[..chunk_read]);
+                sections.push((chunk_position, bytes_to_read));
             }
         }
     }
 
-    // Read tail section (15% from end)
+    // Tail section (15% from end)
     let tail_start = file_size.saturating_sub(tail_size as u64);
-    let mut tail_buffer = vec![0u8; tail_size];
-    reader.seek(SeekFrom::Start(tail_start))?;
-    let tail_read = reader.read(&mut tail_buffer)?;
-    buffer.extend_from_slice(&tail_buffer[..tail_read]);
+    sections.push((tail_start, tail_size));
+
+    // Ask the kernel to fetch every section up front, so the reads below are serviced
+    // concurrently by the device instead of one seek-and-wait at a time
+    for &(position, length) in &sections {
+        prefetch_range(reader, position, length);
+    }
+
+    for &(position, length) in &sections {
+        read_section(reader, position, length, &mut buffer)?;
+    }
 
     Ok(buffer)
 }
 
+/// Append up to `length` bytes starting at `position` to the end of `buffer`
+fn read_section(
+    reader: &mut File,
+    position: u64,
+    length: usize,
+    buffer: &mut Vec<u8>,
+) -> std::io::Result<()> {
+    reader.seek(SeekFrom::Start(position))?;
+    reader.by_ref().take(length as u64).read_to_end(buffer)?;
+    Ok(())
+}
+
+// Hint the kernel that a byte range will be read soon so it starts fetching it in the background
+#[cfg(target_os = "linux")]
+fn prefetch_range(file: &File, position: u64, length: usize) {
+    use std::os::unix::io::AsRawFd;
+
+    // SAFETY: the descriptor stays valid for the lifetime of `file`, and the advice is only a
+    // hint: failures are harmless and intentionally ignored.
+    unsafe {
+        libc::posix_fadvise(
+            file.as_raw_fd(),
+            position as libc::off_t,
+            length as libc::off_t,
+            libc::POSIX_FADV_WILLNEED,
+        );
+    }
+}
+
+#[cfg(not(target_os = "linux"))]
+fn prefetch_range(_file: &File, _position: u64, _length: usize) {}
+
+// Hint the kernel that a file will be read sequentially so it uses aggressive read-ahead
+#[cfg(target_os = "linux")]
+fn advise_sequential(file: &File) {
+    use std::os::unix::io::AsRawFd;
+
+    // SAFETY: see prefetch_range
+    unsafe {
+        libc::posix_fadvise(file.as_raw_fd(), 0, 0, libc::POSIX_FADV_SEQUENTIAL);
+    }
+}
+
+#[cfg(not(target_os = "linux"))]
+fn advise_sequential(_file: &File) {}
+
 /// Analyzes encoding and newline style from a file using streaming
 #[pyfunction]
-#[pyo3(signature = (file_path, min_sample_size=1024*1024, percentage_sample_size=0.1, max_sample_size=None))]
+#[pyo3(signature = (file_path, min_sample_size=1024*1024, percentage_sample_size=0.1, max_sample_size=None, min_confidence=None, candidate_encodings=None))]
 fn analyse_from_path_stream(
     file_path: String,
     min_sample_size: usize,
     percentage_sample_size: f64,
     max_sample_size: Option<usize>,
+    min_confidence: Option<f32>,
+    candidate_encodings: Option<Vec<String>>,
 ) -> PyResult<AnalysisResult> {
-    let path = Path::new(&file_path);
-    let file =
-        File::open(path).map_err(|e| PyIOError::new_err(format!("Failed to open file: {}", e)))?;
+    let candidates = resolve_candidate_encodings(candidate_encodings)?;
+    analyse_file(
+        &file_path,
+        min_sample_size,
+        percentage_sample_size,
+        max_sample_size,
+        min_confidence,
+        candidates.as_deref(),
+    )
+    .map_err(PyIOError::new_err)
+}
+
+/// Analyzes encoding and newline style of many files in parallel
+///
+/// The GIL is released while the files are read and analysed, and the files are
+/// processed concurrently on the Rayon thread pool. Results keep the input order.
+#[pyfunction]
+#[pyo3(signature = (file_paths, min_sample_size=1024*1024, percentage_sample_size=0.1, max_sample_size=None, min_confidence=None, candidate_encodings=None))]
+fn analyse_many(
+    py: Python<'_>,
+    file_paths: Vec<String>,
+    min_sample_size: usize,
+    percentage_sample_size: f64,
+    max_sample_size: Option<usize>,
+    min_confidence: Option<f32>,
+    candidate_encodings: Option<Vec<String>>,
+) -> PyResult<Vec<AnalysisResult>> {
+    let candidates = resolve_candidate_encodings(candidate_encodings)?;
+    py.detach(|| {
+        file_paths
+            .par_iter()
+            .map(|file_path| {
+                analyse_file(
+                    file_path,
+                    min_sample_size,
+                    percentage_sample_size,
+                    max_sample_size,
+                    min_confidence,
+                    candidates.as_deref(),
+                )
+                .map_err(|e| PyIOError::new_err(format!("{}: {}", file_path, e)))
+            })
+            .collect()
+    })
+}
+
+// Resolve the caller's candidate encoding names, rejecting names encoding_rs cannot decode
+fn resolve_candidate_encodings(
+    names: Option<Vec<String>>,
+) -> PyResult<Option<Vec<&'static encoding_rs::Encoding>>> {
+    names
+        .map(|names| {
+            names
+                .iter()
+                .map(|name| {
+                    resolve_encoding(name).ok_or_else(|| {
+                        PyValueError::new_err(format!("Unsupported candidate encoding: {}", name))
+                    })
+                })
+                .collect()
+        })
+        .transpose()
+}
+
+// Look an encoding name up as a WHATWG label first, so every encoding encoding_rs
+// supports is accepted, then as a Python codec name. Every name the detector reports
+// resolves back to its encoding, so analyse() results can be passed to normalize()
+fn resolve_encoding(name: &str) -> Option<&'static encoding_rs::Encoding> {
+    encoding_rs::Encoding::for_label(name.as_bytes())
+        .or_else(|| get_encoding_rs(name))
+        .or_else(|| encoding_rs::Encoding::for_label(name.replace('_', "-").as_bytes()))
+}
+
+// Analyze a single file; does not touch Python objects so it can run without the GIL
+fn analyse_file(
+    file_path: &str,
+    min_sample_size: usize,
+    percentage_sample_size: f64,
+    max_sample_size: Option<usize>,
+    min_confidence: Option<f32>,
+    candidates: Option<&[&'static encoding_rs::Encoding]>,
+) -> Result<AnalysisResult, String> {
+    let path = Path::new(file_path);
+    let mut file = File::open(path).map_err(|e| format!("Failed to open file: {}", e))?;
 
     // Get file size
     let metadata = file
         .metadata()
-        .map_err(|e| PyIOError::new_err(format!("Failed to get file metadata: {}", e)))?;
+        .map_err(|e| format!("Failed to get file metadata: {}", e))?;
     let file_size = metadata.len();
 
     if file_size == 0 {
-        return Err(PyIOError::new_err("File is empty"));
+        return Err("File is empty".to_string());
     }
 
     // Calculate effective sample size
@@ -375,22 +664,51 @@ fn analyse_from_path_stream(
         max_sample_size,
     );
 
-    let mut reader = BufReader::new(file);
-
     // Read strategic sample from file
-    let buffer = read_strategic_sample(&mut reader, file_size, sample_size)
-        .map_err(|e| PyIOError::new_err(format!("Failed to read file: {}", e)))?;
+    let buffer = read_strategic_sample(&mut file, file_size, sample_size)
+        .map_err(|e| format!("Failed to read file: {}", e))?;
 
     if buffer.is_empty() {
-        return Err(PyIOError::new_err("Failed to read any data from file"));
+        return Err("Failed to read any data from file".to_string());
     }
 
     // Detect newline style
     let newlines = detect_newline_style(&buffer);
 
+    let byte_classes = ByteClassCounts::from_buffer(&buffer);
+
+    // A pure ASCII sample (that is not UTF-16 by its null pattern) always
+    // resolves to UTF-8, so skip chardet and candidate scoring
+    if byte_classes.high == 0
+        && candidates.is_none_or(|allowed| allowed.contains(&encoding_rs::UTF_8))
+        && detect_utf16_pattern(&buffer).is_none()
+    {
+        return Ok(AnalysisResult {
+            encoding: normalize_encoding_name("UTF-8"),
+            newlines: newlines.to_string(),
+        });
+    }
+
+    // A UTF-8 or UTF-16 byte order mark decides the encoding outright, as in the Python
+    // precheck. encoding_rs has no UTF-32 decoder, so a UTF-32LE BOM must not pass for UTF-16LE
+    let bom = encoding_rs::Encoding::for_bom(&buffer).filter(|_| !buffer.starts_with(&UTF32LE_BOM));
+    if let Some((bom_encoding, _)) = bom {
+        if candidates.is_none_or(|allowed| allowed.contains(&bom_encoding)) {
+            return Ok(AnalysisResult {
+                encoding: normalize_encoding_name(bom_encoding.name()),
+                newlines: newlines.to_string(),
+            });
+        }
+    }
+
+    let byte_hints = analyze_byte_patterns(&byte_classes, buffer.len());
+
+    // Whether chardet is confident enough to skip scoring the other candidates
+    let mut confident = false;
+
     // Detect encoding (reuse existing logic)
     let (encoding_str, skip_bytes) = if buffer.starts_with(&[0xEF, 0xBB, 0xBF]) {
-        ("utf_8", 3)
+        ("UTF-8", 3)
     } else if buffer.starts_with(&[0xFF, 0xFE]) {
         ("UTF-16LE", 2)
     } else if buffer.starts_with(&[0xFE, 0xFF]) {
@@ -402,9 +720,9 @@ fn analyse_from_path_stream(
     } else if let Some(utf16_encoding) = detect_utf16_pattern(&buffer) {
         (utf16_encoding, 0)
     } else {
-        let byte_hints = analyze_byte_patterns(&buffer);
         let result = chardet::detect(&buffer);
         let detected = result.0.to_lowercase().replace("-", "_");
+        confident = min_confidence.is_some_and(|threshold| result.1 >= threshold);
 
         let encoding = match detected.as_str() {
             "utf_8" | "utf8" | "ascii" => "UTF-8",
@@ -444,30 +762,50 @@ fn analyse_from_path_stream(
     let buffer_slice = &buffer[skip_bytes..];
     let mut encodings_to_try = vec![encoding_str];
 
-    let byte_hints = analyze_byte_patterns(&buffer);
-
-    for enc in &[
-        "UTF-8",
-        "x-mac-cyrillic",
-        "windows-1252",
-        "windows-1256",
-        "windows-1255",
-        "windows-1253",
-        "windows-1251",
-        "windows-1254",
-        "windows-1250",
-        "windows-949",
-        "Big5",
-        "GBK",
-        "shift_jis",
-        "EUC-JP",
-        "EUC-KR",
-        "mac-cyrillic",
-        "KOI8-R",
-        "ISO-8859-1",
-    ] {
-        if !encodings_to_try.contains(enc) {
-            encodings_to_try.push(enc);
+    // Only score the other candidates when chardet's answer is not trusted outright
+    if !confident {
+        for enc in &[
+            "UTF-8",
+            "x-mac-cyrillic",
+            "windows-1252",
+            "windows-1256",
+            "windows-1255",
+            "windows-1253",
+            "windows-1251",
+            "windows-1254",
+            "windows-1250",
+            "windows-949",
+            "Big5",
+            "GBK",
+            "shift_jis",
+            "EUC-JP",
+            "EUC-KR",
+            "mac-cyrillic",
+            "KOI8-R",
+            "ISO-8859-1",
+        ] {
+            if !encodings_to_try.contains(enc) {
+                encodings_to_try.push(enc);
+            }
+        }
+    }
+
+    // Only score the encodings the caller allowed, adding the ones not listed above
+    // unless chardet's allowed guess is trusted outright
+    if let Some(allowed) = candidates {
+        encodings_to_try.retain(|name| {
+            encoding_rs::Encoding::for_label(name.as_bytes())
+                .is_some_and(|encoding| allowed.contains(&encoding))
+        });
+        if !confident || encodings_to_try.is_empty() {
+            for encoding in allowed {
+                let covered = encodings_to_try.iter().any(|name| {
+                    encoding_rs::Encoding::for_label(name.as_bytes()) == Some(*encoding)
+                });
+                if !covered {
+                    encodings_to_try.push(encoding.name());
+                }
+            }
         }
     }
 
@@ -577,6 +915,7 @@ fn get_encoding_rs(encoding_name: &str) -> Option<&'static encoding_rs::Encoding
         "windows_1254" | "cp1254" | "cp_1254" => "windows-1254",
         "windows_1250" | "cp1250" | "cp_1250" => "windows-1250",
         "windows_949" | "cp949" | "cp_949" => "windows-949",
+        "windows_874" | "cp874" | "cp_874" => "windows-874",
         "shift_jis" | "shift_jisx0213" | "cp932" => "shift_jis",
         "euc_jp" | "eucjp" => "euc-jp",
         "euc_kr" | "euckr" => "euc-kr",
@@ -598,7 +937,8 @@ fn get_encoding_rs(encoding_name: &str) -> Option<&'static encoding_rs::Encoding
 /// This function processes files in chunks to maintain constant memory usage,
 /// making it suitable for very large files (10GB+) on systems with limited RAM (512MB).
 #[pyfunction]
-#[pyo3(signature = (file_path, output_path, target_encoding="utf-8", target_newlines="LF", min_sample_size=1024*1024, percentage_sample_size=0.1, max_sample_size=None))]
+#[pyo3(signature = (file_path, output_path, target_encoding="utf-8", target_newlines="LF", min_sample_size=1024*1024, percentage_sample_size=0.1, max_sample_size=None, source_encoding=None))]
+#[allow(clippy::too_many_arguments)]
 fn normalize_file_stream(
     file_path: String,
     output_path: String,
@@ -607,12 +947,13 @@ fn normalize_file_stream(
     min_sample_size: usize,
     percentage_sample_size: f64,
     max_sample_size: Option<usize>,
+    source_encoding: Option<String>,
 ) -> PyResult<()> {
     // Validate target_newlines
-    let newline_bytes: &[u8] = match target_newlines {
-        "LF" => b"\n",
-        "CRLF" => b"\r\n",
-        "CR" => b"\r",
+    let newline_str: &str = match target_newlines {
+        "LF" => "\n",
+        "CRLF" => "\r\n",
+        "CR" => "\r",
         _ => {
             return Err(PyIOError::new_err(format!(
                 "Invalid newlines value '{}'. Must be 'LF', 'CRLF', or 'CR'",
@@ -621,23 +962,32 @@ fn normalize_file_stream(
         }
     };
 
-    // First, analyse the file to detect source encoding
-    let analysis = analyse_from_path_stream(
-        file_path.clone(),
-        min_sample_size,
-        percentage_sample_size,
-        max_sample_size,
-    )?;
+    // Analyse the file to detect source encoding, unless the caller already did
+    let source_encoding_name = match source_encoding {
+        Some(encoding) => encoding,
+        None => {
+            analyse_file(
+                &file_path,
+                min_sample_size,
+                percentage_sample_size,
+                max_sample_size,
+                None,
+                None,
+            )
+            .map_err(PyIOError::new_err)?
+            .encoding
+        }
+    };
 
     // Get source and target encodings
-    let source_encoding = get_encoding_rs(&analysis.encoding).ok_or_else(|| {
+    let source_encoding = resolve_encoding(&source_encoding_name).ok_or_else(|| {
         PyIOError::new_err(format!(
             "Unsupported source encoding: {}",
-            analysis.encoding
+            source_encoding_name
         ))
     })?;
 
-    let target_encoding_rs = get_encoding_rs(target_encoding).ok_or_else(|| {
+    let target_encoding_rs = resolve_encoding(target_encoding).ok_or_else(|| {
         PyIOError::new_err(format!("Unsupported target encoding: {}", target_encoding))
     })?;
 
@@ -645,22 +995,178 @@ fn normalize_file_stream(
     let input_path = Path::new(&file_path);
     let output_path_obj = Path::new(&output_path);
 
-    let input_file = File::open(input_path)
+    // Chunks are far larger than BufReader's internal buffer, so read the file directly
+    let mut reader = File::open(input_path)
         .map_err(|e| PyIOError::new_err(format!("Failed to open input file: {}", e)))?;
+    // Read-ahead lets the kernel fetch the next chunks while the current one is converted
+    advise_sequential(&reader);
     let output_file = File::create(output_path_obj)
         .map_err(|e| PyIOError::new_err(format!("Failed to create output file: {}", e)))?;
 
-    let mut reader = BufReader::new(input_file);
     let mut writer = BufWriter::new(output_file);
 
+    // When only the newline style changes in an ASCII-compatible encoding, CR and LF bytes
+    // can never be part of a multi-byte character, so the newlines are rewritten directly
+    // on the raw bytes without decoding and re-encoding. Files starting with a BOM still go
+    // through the decoder, which sniffs and strips it.
+    let mut transcode = source_encoding != target_encoding_rs
+        || !source_encoding.is_ascii_compatible()
+        || starts_with_bom(&mut reader)
+            .map_err(|e| PyIOError::new_err(format!("Failed to read from input file: {}", e)))?;
+
+    // Detection only saw a sample, so the raw rewrite can still meet malformed bytes. Those
+    // must be replaced as the decoder does, so the file is transcoded from the start instead.
+    if !transcode
+        && !rewrite_newlines_stream(
+            &mut reader,
+            &mut writer,
+            source_encoding,
+            newline_str.as_bytes(),
+        )?
+    {
+        rewind_streams(&mut reader, &mut writer)
+            .map_err(|e| PyIOError::new_err(format!("Failed to restart conversion: {}", e)))?;
+        transcode = true;
+    }
+
+    if transcode {
+        transcode_stream(
+            &mut reader,
+            &mut writer,
+            source_encoding,
+            target_encoding_rs,
+            newline_str,
+        )?;
+    }
+
+    // Flush the writer
+    writer
+        .flush()
+        .map_err(|e| PyIOError::new_err(format!("Failed to flush output: {}", e)))?;
+
+    Ok(())
+}
+
+// Check whether the file starts with a UTF-8 or UTF-16 BOM, leaving the reader at the start
+fn starts_with_bom(reader: &mut File) -> std::io::Result<bool> {
+    let mut head = Vec::with_capacity(3);
+    reader.by_ref().take(3).read_to_end(&mut head)?;
+    reader.seek(SeekFrom::Start(0))?;
+
+    Ok(head.starts_with(&[0xEF, 0xBB, 0xBF])
+        || head.starts_with(&[0xFF, 0xFE])
+        || head.starts_with(&[0xFE, 0xFF]))
+}
+
+// Stream the input to the output converting only newlines, without any decoding.
+//
+// Every chunk is still validated against the encoding before it is written. Returns false,
+// leaving partial output behind, as soon as a malformed byte sequence is found.
+fn rewrite_newlines_stream(
+    reader: &mut File,
+    writer: &mut BufWriter<File>,
+    encoding: &'static encoding_rs::Encoding,
+    newline: &[u8],
+) -> PyResult<bool> {
+    let mut input_buffer = vec![0u8; CHUNK_SIZE];
+    let mut output_buffer = Vec::with_capacity(CHUNK_SIZE * 2);
+    let mut validator = encoding.new_decoder_without_bom_handling();
+    let mut validate_buffer = vec![0u8; CHUNK_SIZE * 3];
+    let mut pending_cr = false;
+
+    loop {
+        let bytes_read = reader
+            .read(&mut input_buffer)
+            .map_err(|e| PyIOError::new_err(format!("Failed to read from input file: {}", e)))?;
+
+        let is_last = bytes_read == 0;
+        if !is_valid_chunk(
+            &mut validator,
+            &input_buffer[..bytes_read],
+            &mut validate_buffer,
+            is_last,
+        ) {
+            return Ok(false);
+        }
+
+        output_buffer.clear();
+        convert_newlines_bytes(
+            &input_buffer[..bytes_read],
+            newline,
+            &mut pending_cr,
+            &mut output_buffer,
+        );
+
+        if is_last && pending_cr {
+            output_buffer.extend_from_slice(newline);
+            pending_cr = false;
+        }
+
+        writer
+            .write_all(&output_buffer)
+            .map_err(|e| PyIOError::new_err(format!("Failed to write to output: {}", e)))?;
+
+        if is_last {
+            return Ok(true);
+        }
+    }
+}
+
+// Feed a chunk to a decoder that does not replace errors, checking that it is well formed.
+// The decoder keeps sequences split across chunks, and `last` checks nothing is left over.
+fn is_valid_chunk(
+    validator: &mut encoding_rs::Decoder,
+    chunk: &[u8],
+    scratch: &mut [u8],
+    last: bool,
+) -> bool {
+    let mut start = 0;
+    loop {
+        let (result, bytes_read, _) =
+            validator.decode_to_utf8_without_replacement(&chunk[start..], scratch, last);
+        start += bytes_read;
+        match result {
+            encoding_rs::DecoderResult::InputEmpty => return true,
+            encoding_rs::DecoderResult::OutputFull => continue,
+            encoding_rs::DecoderResult::Malformed(_, _) => return false,
+        }
+    }
+}
+
+// Move the input back to its start and discard everything written to the output so far
+fn rewind_streams(reader: &mut File, writer: &mut BufWriter<File>) -> std::io::Result<()> {
+    reader.seek(SeekFrom::Start(0))?;
+    writer.flush()?;
+    let output = writer.get_mut();
+    output.set_len(0)?;
+    output.seek(SeekFrom::Start(0))?;
+    Ok(())
+}
+
+// Stream the input to the output, decoding from the source encoding, converting newlines
+// and encoding into the target encoding chunk by chunk
+fn transcode_stream(
+    reader: &mut File,
+    writer: &mut BufWriter<File>,
+    source_encoding: &'static encoding_rs::Encoding,
+    target_encoding: &'static encoding_rs::Encoding,
+    newline_str: &str,
+) -> PyResult<()> {
     // Create decoder and encoder
     let mut decoder = source_encoding.new_decoder();
-    let mut encoder = target_encoding_rs.new_encoder();
+    let mut encoder = target_encoding.new_encoder();
 
-    // Buffers for streaming processing
+    // Buffers for streaming processing, allocated once and reused for every chunk
     let mut input_buffer = vec![0u8; CHUNK_SIZE];
-    let mut decode_buffer = String::with_capacity(CHUNK_SIZE * 2);
-    let mut encode_buffer = vec![0u8; CHUNK_SIZE * 4]; // Larger to accommodate multi-byte encodings
+    let mut decode_buffer = String::with_capacity(CHUNK_SIZE * 3);
+    let mut newline_buffer = String::with_capacity(CHUNK_SIZE * 3);
+    // Decoded text already is UTF-8, so a UTF-8 target is written directly without an encoder
+    let utf8_target = target_encoding == encoding_rs::UTF_8;
+    let mut encode_buffer = if utf8_target {
+        Vec::new()
+    } else {
+        vec![0u8; CHUNK_SIZE * 4] // Larger to accommodate multi-byte encodings
+    };
 
     // State for newline conversion
     let mut pending_cr = false; // Track if previous chunk ended with CR
@@ -673,8 +1179,11 @@ fn normalize_file_stream(
 
         let is_last = bytes_read == 0;
 
-        // Decode chunk
+        // Decode chunk, making sure the buffer can hold the worst-case expansion
         decode_buffer.clear();
+        if let Some(needed) = decoder.max_utf8_buffer_length(bytes_read) {
+            decode_buffer.reserve(needed);
+        }
         let (result, _bytes_read, _had_errors) =
             decoder.decode_to_string(&input_buffer[..bytes_read], &mut decode_buffer, is_last);
 
@@ -682,114 +1191,132 @@ fn normalize_file_stream(
             return Err(PyIOError::new_err("Decode buffer too small"));
         }
 
-        // Process and write decoded chunk with newline conversion
-        if !decode_buffer.is_empty() {
-            process_and_write_chunk(
-                &decode_buffer,
+        // Convert newlines in a single pass over the decoded chunk
+        newline_buffer.clear();
+        convert_newlines(
+            &decode_buffer,
+            newline_str,
+            &mut pending_cr,
+            &mut newline_buffer,
+        );
+
+        // A CR at the very end of the file is a standalone newline
+        if is_last && pending_cr {
+            newline_buffer.push_str(newline_str);
+            pending_cr = false;
+        }
+
+        if utf8_target {
+            writer
+                .write_all(newline_buffer.as_bytes())
+                .map_err(|e| PyIOError::new_err(format!("Failed to write to output: {}", e)))?;
+        } else if !newline_buffer.is_empty() || is_last {
+            // Always run the encoder on the last chunk so stateful encoders get flushed
+            encode_and_write_chunk(
+                &newline_buffer,
                 &mut encoder,
                 &mut encode_buffer,
-                &mut writer,
-                newline_bytes,
-                &mut pending_cr,
+                writer,
                 is_last,
             )?;
         }
 
         if is_last {
-            break;
+            return Ok(());
         }
     }
+}
 
-    // Flush the writer
-    writer
-        .flush()
-        .map_err(|e| PyIOError::new_err(format!("Failed to flush output: {}", e)))?;
-
-    Ok(())
+// Rewrite every CRLF, CR and LF in `text` as `newline`, appending the result to `output`
+fn convert_newlines(text: &str, newline: &str, pending_cr: &mut bool, output: &mut String) {
+    // SAFETY: only ASCII CR/LF bytes are replaced, by ASCII newline bytes, and the runs in
+    // between are copied verbatim, so the output remains valid UTF-8.
+    let output_bytes = unsafe { output.as_mut_vec() };
+    convert_newlines_bytes(
+        text.as_bytes(),
+        newline.as_bytes(),
+        pending_cr,
+        output_bytes,
+    );
 }
 
-// Helper function to process a text chunk, convert newlines, and write to output
-fn process_and_write_chunk(
-    text: &str,
-    encoder: &mut encoding_rs::Encoder,
-    encode_buffer: &mut Vec<u8>,
-    writer: &mut BufWriter<File>,
-    newline_bytes: &[u8],
+// Rewrite every CRLF, CR and LF in `bytes` as `newline`, appending the result to `output`.
+//
+// CR and LF are ASCII, so in UTF-8 and in every other ASCII-compatible encoding they never
+// occur inside a multi-byte character and the input can be scanned byte by byte, copying
+// the runs between newlines as whole slices. A CR at the end of the chunk is held back in
+// `pending_cr` because it may be the first half of a CRLF split across chunks.
+fn convert_newlines_bytes(
+    bytes: &[u8],
+    newline: &[u8],
     pending_cr: &mut bool,
-    is_last: bool,
-) -> PyResult<()> {
-    // Convert newline bytes to string once (safe because we validate newline_bytes is valid UTF-8)
-    let newline_str =
-        std::str::from_utf8(newline_bytes).expect("newline_bytes should always be valid UTF-8");
-
-    // Process text character by character to handle newlines
-    let mut output = String::with_capacity(text.len());
-    let chars: Vec<char> = text.chars().collect();
-
-    for (i, &ch) in chars.iter().enumerate() {
-        if *pending_cr {
-            // Previous chunk ended with CR
-            if ch == '\n' {
-                // This is CRLF split across chunks, output target newline
-                output.push_str(newline_str);
-                *pending_cr = false;
-                continue;
-            } else {
-                // Previous CR was standalone, output it and continue
-                output.push_str(newline_str);
-                *pending_cr = false;
-            }
+    output: &mut Vec<u8>,
+) {
+    let mut start = 0;
+
+    if *pending_cr && !bytes.is_empty() {
+        output.extend_from_slice(newline);
+        *pending_cr = false;
+        if bytes[0] == b'\n' {
+            // Second half of a CRLF split across chunks
+            start = 1;
         }
+    }
 
-        match ch {
-            '\r' => {
-                // Check if next char is \n
-                if i + 1 < chars.len() && chars[i + 1] == '\n' {
-                    // CRLF - will handle \n in next iteration
-                    output.push_str(newline_str);
-                } else if i + 1 == chars.len() && !is_last {
-                    // CR at end of chunk, might be part of CRLF
+    let mut i = start;
+    while i < bytes.len() {
+        match bytes[i] {
+            b'\r' => {
+                output.extend_from_slice(&bytes[start..i]);
+                if i + 1 == bytes.len() {
                     *pending_cr = true;
+                    i += 1;
+                } else if bytes[i + 1] == b'\n' {
+                    output.extend_from_slice(newline);
+                    i += 2;
                 } else {
-                    // Standalone CR
-                    output.push_str(newline_str);
-                }
-            }
-            '\n' => {
-                // Check if this is part of CRLF (previous char was \r)
-                if i > 0 && chars[i - 1] == '\r' {
-                    // Already handled as CRLF, skip
-                    continue;
-                } else {
-                    // Standalone LF
-                    output.push_str(newline_str);
+                    output.extend_from_slice(newline);
+                    i += 1;
                 }
+                start = i;
             }
-            _ => {
-                output.push(ch);
+            b'\n' => {
+                output.extend_from_slice(&bytes[start..i]);
+                output.extend_from_slice(newline);
+                i += 1;
+                start = i;
             }
+            _ => i += 1,
         }
     }
 
-    // Encode and write the processed text
-    if !output.is_empty() {
-        let mut start = 0;
-        loop {
-            let (result, bytes_read, bytes_written, _had_errors) =
-                encoder.encode_from_utf8(&output[start..], encode_buffer, is_last);
+    output.extend_from_slice(&bytes[start..]);
+}
 
-            // Write encoded bytes
-            if bytes_written > 0 {
-                writer
-                    .write_all(&encode_buffer[..bytes_written])
-                    .map_err(|e| PyIOError::new_err(format!("Failed to write to output: {}", e)))?;
-            }
+// Helper function to encode a text chunk into the target encoding and write it to output
+fn encode_and_write_chunk(
+    text: &str,
+    encoder: &mut encoding_rs::Encoder,
+    encode_buffer: &mut [u8],
+    writer: &mut BufWriter<File>,
+    is_last: bool,
+) -> PyResult<()> {
+    let mut start = 0;
+    loop {
+        let (result, bytes_read, bytes_written, _had_errors) =
+            encoder.encode_from_utf8(&text[start..], encode_buffer, is_last);
+
+        // Write encoded bytes
+        if bytes_written > 0 {
+            writer
+                .write_all(&encode_buffer[..bytes_written])
+                .map_err(|e| PyIOError::new_err(format!("Failed to write to output: {}", e)))?;
+        }
 
-            start += bytes_read;
+        start += bytes_read;
 
-            if result == encoding_rs::CoderResult::InputEmpty {
-                break;
-            }
+        if result == encoding_rs::CoderResult::InputEmpty {
+            break;
         }
     }
 
@@ -800,6 +1327,7 @@ fn process_and_write_chunk(
 #[pymodule]
 fn _internal(m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(analyse_from_path_stream, m)?)?;
+    m.add_function(wrap_pyfunction!(analyse_many, m)?)?;
     m.add_function(wrap_pyfunction!(normalize_file_stream, m)?)?;
     m.add_class::<AnalysisResult>()?;
     Ok(())
@@ -0,0 +1,11 @@
+"""
+Sample files used by the detection tests, listed once at import time
+"""
+
+import os
+from pathlib import Path
+
+DIR_PATH = Path(__file__).parent.absolute() / "data"
+
+# Sorted so every pytest-xdist worker collects the parametrized tests in the same order
+DATA_FILES = sorted(Path(entry.path) for entry in os.scandir(DIR_PATH) if entry.is_file())
@@ -0,0 +1,67 @@
+import functools
+import itertools
+import os
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def expected_charset() -> Callable[[Path], str | None]:
+    """
+    Return a function giving the encoding charset_normalizer detects for a file, or None.
+
+    charset_normalizer is slow and only provides expected values, so it is imported once
+    per session (once per worker under pytest-xdist) and each file is detected at most once there.
+    """
+    from charset_normalizer import from_path
+
+    @functools.cache
+    def detect(file_path: Path) -> str | None:
+        best = from_path(file_path.as_posix()).best()
+        return None if best is None else best.encoding
+
+    return detect
+
+
+@pytest.fixture
+def tmp_file(tmp_path: Path) -> Iterator[Path]:
+    """
+    Path of a not yet created file in the test's temporary directory.
+
+    The file is removed after the test so multi-megabyte fixtures do not pile up in the
+    temporary directories pytest keeps from previous runs.
+    """
+    path = tmp_path / "sample.txt"
+    yield path
+    path.unlink(missing_ok=True)
+
+
+@pytest.fixture
+def memfile(tmp_path: Path) -> Iterator[Callable[[bytes], str]]:
+    """
+    Return a function that stores bytes in a file only read by the test and returns its path.
+
+    Where memfd_create is available (Linux) the file is anonymous memory reached through
+    /proc/self/fd, so no filesystem is involved; elsewhere it is a regular file in tmp_path.
+    normalize() cannot use these paths, since it needs a real directory to rename into.
+    """
+    fds: list[int] = []
+    counter = itertools.count()
+
+    def create(data: bytes) -> str:
+        if not hasattr(os, "memfd_create"):
+            path = tmp_path / f"memfile-{next(counter)}.txt"
+            path.write_bytes(data)
+            return str(path)
+
+        fd = os.memfd_create("charsetrs-test")
+        fds.append(fd)
+        with open(fd, "wb", closefd=False) as f:
+            f.write(data)
+        return f"/proc/self/fd/{fd}"
+
+    yield create
+    for fd in fds:
+        os.close(fd)
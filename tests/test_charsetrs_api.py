@@ -3,6 +3,8 @@ Tests for the charsetrs API: analyse() and normalize()
 """
 
 import os
+import subprocess
+import sys
 import tempfile
 from pathlib import Path
 
@@ -33,6 +35,12 @@ def test_analyse_utf8_file():
         os.unlink(temp_path)
 
 
+def test_analysis_result_has_no_instance_dict():
+    """Test that AnalysisResult uses __slots__ instead of a per-instance __dict__"""
+    result = charsetrs.AnalysisResult(encoding="utf_8", newlines="LF")
+    assert not hasattr(result, "__dict__")
+
+
 def test_analyse_latin1_file():
     """Test analysing Latin-1 encoded file"""
     with tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=".txt") as f:
@@ -82,6 +90,106 @@ def test_analyse_cr_newlines():
         os.unlink(temp_path)
 
 
+def _crlf_at(offset: int) -> bytes:
+    """Build a 70-byte LF file with a single CRLF whose CR sits at the given offset"""
+    # 70 bytes leave a few pairs after the last full 16-byte block for the scalar tail
+    data = bytearray(b"line\n" * 13 + b"lines")
+    data[offset : offset + 2] = b"\r\n"
+    return bytes(data)
+
+
+@pytest.mark.parametrize(
+    ("content", "expected"),
+    [
+        (b"Line 1\rLine 2\rLine 3\rLine 4\rLine 5\rLine 6\r", "CR"),
+        (b"Line 1\rLine 2\rLine 3\rLine 4\rLine 5\rLine 6", "CR"),
+        (b"Line 1\nLine 2\nLine 3\nLine 4\nLine 5\nLine 6\n", "LF"),
+        (b"\nLine 1\nLine 2\nLine 3\nLine 4\nLine 5\nLine 6", "LF"),
+        (b"x" * 15 + b"\r" + b"x" * 32, "CR"),
+        (b"No newlines at all in this file, only text.", "LF"),
+        (_crlf_at(15), "CRLF"),
+        (_crlf_at(16), "CRLF"),
+        (_crlf_at(17), "CRLF"),
+        (_crlf_at(66), "CRLF"),
+    ],
+    ids=[
+        "cr",
+        "cr-no-trailing",
+        "lf",
+        "lf-leading",
+        "cr-block-end",
+        "none",
+        "crlf-15",
+        "crlf-16",
+        "crlf-17",
+        "crlf-tail",
+    ],
+)
+def test_analyse_newlines_in_rust_detector(tmp_file, content, expected):
+    """Test the Rust newline scan across 16-byte block boundaries"""
+    tmp_file.write_bytes(content)
+
+    # A min_sample_size below the file size skips the Python precheck, and sampling 100%
+    # of the file makes the Rust detector scan every byte
+    result = charsetrs.analyse(tmp_file, min_sample_size=1, percentage_sample_size=1.0)
+    assert result.newlines == expected
+
+
+@pytest.mark.parametrize("lines", [200, 5000], ids=["head-only", "past-head"])
+def test_analyse_ascii_file_matches_sampled_detection(tmp_file, lines):
+    """Test that the pure ASCII precheck agrees with the Rust detector"""
+    # 5000 lines make the file larger than the 64KB head the precheck reads first
+    tmp_file.write_bytes(b"plain ascii line\r\n" * lines)
+
+    # The default sample covers the whole file, while a min_sample_size below the file size
+    # forces the Rust detector, either over a small sample or over every byte
+    precheck = charsetrs.analyse(tmp_file)
+    sampled = charsetrs.analyse(tmp_file, min_sample_size=1024, percentage_sample_size=0.0)
+    full = charsetrs.analyse(tmp_file, min_sample_size=1, percentage_sample_size=1.0)
+    assert precheck == sampled == full == charsetrs.AnalysisResult(encoding="utf_8", newlines="CRLF")
+
+
+@pytest.mark.parametrize(
+    ("expected_encoding", "content"),
+    [
+        ("utf_8", b"\xef\xbb\xbf" + "Olá mundo\n".encode() * 50),
+        ("utf_16le", b"\xff\xfe" + "Olá mundo\n".encode("utf-16-le") * 50),
+        ("utf_16be", b"\xfe\xff" + "Olá mundo\n".encode("utf-16-be") * 50),
+    ],
+    ids=["utf_8", "utf_16le", "utf_16be"],
+)
+def test_analyse_bom_files(tmp_file, expected_encoding, content):
+    """Test that a byte order mark decides the encoding in the Python precheck and in Rust alike"""
+    tmp_file.write_bytes(content)
+    expected = charsetrs.AnalysisResult(encoding=expected_encoding, newlines="LF")
+
+    assert charsetrs.analyse(tmp_file) == expected
+    assert charsetrs.analyse(tmp_file, min_sample_size=1, percentage_sample_size=1.0) == expected
+
+
+def test_analyse_utf32le_bom_file_is_left_to_rust(tmp_file):
+    """Test that a UTF-32LE BOM is not taken for the UTF-16LE BOM it starts with"""
+    tmp_file.write_bytes(b"\xff\xfe\x00\x00" + "Olá mundo\n".encode("utf-32-le") * 50)
+
+    # The precheck must not resolve the file on its own, so both runs reach the same scoring
+    full = charsetrs.analyse(tmp_file, min_sample_size=1, percentage_sample_size=1.0)
+    assert charsetrs.analyse(tmp_file) == full
+    assert charsetrs.analyse_many([tmp_file]) == [full]
+
+
+@pytest.mark.parametrize(
+    "text", ["Привет, мир! Это тест.\n", "مرحبا بالعالم، هذا اختبار.\n"], ids=["russian", "arabic"]
+)
+def test_analyse_non_latin_utf8_bom_file_agrees_across_detectors(tmp_file, text):
+    """Test that a UTF-8 BOM decides the encoding in the Python precheck and in Rust alike"""
+    tmp_file.write_bytes(b"\xef\xbb\xbf" + text.encode() * 50)
+    expected = charsetrs.AnalysisResult(encoding="utf_8", newlines="LF")
+
+    assert charsetrs.analyse(tmp_file) == expected
+    assert charsetrs.analyse(tmp_file, min_sample_size=1, percentage_sample_size=1.0) == expected
+    assert charsetrs.analyse_many([tmp_file]) == [expected]
+
+
 def test_analyse_with_max_sample_size():
     """Test analyse() with custom max_sample_size parameter"""
     with tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=".txt") as f:
@@ -106,6 +214,109 @@ def test_analyse_with_max_sample_size():
         os.unlink(temp_path)
 
 
+@pytest.mark.parametrize("value", ["1mb", "0", "-1"])
+def test_invalid_max_sample_env_is_reported(value):
+    """Test that a malformed CHARSETRS_MAX_SAMPLE fails the import with a message naming it"""
+    env = {**os.environ, "CHARSETRS_MAX_SAMPLE": value}
+    result = subprocess.run(
+        [sys.executable, "-c", "import charsetrs"], env=env, capture_output=True, text=True, check=False
+    )
+    assert result.returncode != 0
+    assert "CHARSETRS_MAX_SAMPLE must be a positive number of bytes" in result.stderr
+
+
+def test_analyse_with_min_confidence(tmp_file):
+    """Test analyse() trusting the initial guess through min_confidence"""
+    tmp_file.write_bytes("Texto em UTF-8: café, São Paulo, München\n".encode() * 50)
+
+    result = charsetrs.analyse(tmp_file, min_confidence=0.0)
+    assert result.encoding.lower().replace("-", "_") in ["utf_8", "utf8"]
+    assert result.newlines == "LF"
+
+
+def test_analyse_with_candidate_encodings(tmp_file):
+    """Test analyse() only scoring the candidate encodings it is given"""
+    tmp_file.write_bytes("Привет, мир! Это тестовый файл.\n".encode("cp1251") * 20)
+
+    result = charsetrs.analyse(tmp_file, candidate_encodings=["windows-1251"])
+    assert result.encoding == "cp1251"
+
+    results = charsetrs.analyse_many([tmp_file], candidate_encodings=["windows-1251"])
+    assert results == [result]
+
+    with pytest.raises(ValueError):
+        charsetrs.analyse(tmp_file, candidate_encodings=[])
+    with pytest.raises(ValueError):
+        charsetrs.analyse(tmp_file, candidate_encodings=["not-an-encoding"])
+    with pytest.raises(TypeError):
+        charsetrs.analyse(tmp_file, candidate_encodings="windows-1251")
+    with pytest.raises(TypeError):
+        charsetrs.analyse_many([tmp_file], candidate_encodings="windows-1251")
+
+
+@pytest.mark.parametrize(
+    ("candidate", "expected"),
+    [("iso-8859-2", "iso_8859_2"), ("ISO-8859-2", "iso_8859_2"), ("iso8859_2", "iso_8859_2"), ("latin2", "iso_8859_2")],
+)
+def test_analyse_with_whatwg_candidate_encoding(tmp_file, candidate, expected):
+    """Test that candidate encodings accept any label encoding_rs supports"""
+    content = "Zażółć gęślą jaźń. Pchnąć w tę łódź jeża.\n".encode("iso-8859-2") * 20
+    tmp_file.write_bytes(content)
+
+    result = charsetrs.analyse(tmp_file, candidate_encodings=[candidate])
+    assert result.encoding == expected
+    assert charsetrs.analyse_many([tmp_file], candidate_encodings=[candidate]) == [result]
+    assert content.decode(result.encoding) == content.decode("iso-8859-2")
+
+
+@pytest.mark.parametrize(
+    ("text", "codec", "candidate"),
+    [
+        ("Zażółć gęślą jaźń. Pchnąć w tę łódź jeża.\n", "iso-8859-2", "iso-8859-2"),
+        ("สวัสดีชาวโลก นี่คือการทดสอบ\n", "cp874", "windows-874"),
+    ],
+    ids=["iso-8859-2", "windows-874"],
+)
+def test_normalize_accepts_encoding_reported_by_analyse(tmp_file, text, codec, candidate):
+    """Test that every encoding name analyse() reports is accepted back by normalize()"""
+    content = text.encode(codec) * 20
+    tmp_file.write_bytes(content)
+
+    result = charsetrs.analyse(tmp_file, candidate_encodings=[candidate])
+    charsetrs.normalize(tmp_file, encoding="utf-8", newlines="LF", source_encoding=result.encoding)
+
+    assert tmp_file.read_bytes() == content.decode(codec).encode()
+
+
+def test_analyse_caches_unchanged_file(tmp_file):
+    """Test that analyse() reuses results until the file changes"""
+    tmp_file.write_bytes(b"Line 1\nLine 2\n")
+
+    first = charsetrs.analyse(tmp_file)
+    assert charsetrs.analyse(tmp_file) is first
+
+    tmp_file.write_bytes(b"Line 1\r\nLine 2\r\nLine 3\r\n")
+
+    changed = charsetrs.analyse(tmp_file)
+    assert changed is not first
+    assert changed.newlines == "CRLF"
+
+
+def test_clear_cache_picks_up_rewrite_with_same_size_and_mtime(tmp_file):
+    """Test that clear_cache() drops results a coarse-timestamp rewrite would leave stale"""
+    tmp_file.write_bytes(b"Line 1\nLine 2\n")
+    stat_result = tmp_file.stat()
+    assert charsetrs.analyse(tmp_file).newlines == "LF"
+
+    # Same size and restored mtime, as when a rewrite lands within the timestamp granularity
+    tmp_file.write_bytes(b"Line 1\rLine 2\r")
+    os.utime(tmp_file, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    assert charsetrs.analyse(tmp_file).newlines == "LF"
+
+    charsetrs.clear_cache()
+    assert charsetrs.analyse(tmp_file).newlines == "CR"
+
+
 def test_analyse_nonexistent_file():
     """Test that analyse() raises error for nonexistent file"""
     with pytest.raises(Exception):
@@ -139,6 +350,23 @@ def test_analyse_with_path_object():
         os.unlink(temp_path)
 
 
+def test_analyse_many_matches_analyse():
+    """Test that analyse_many() returns the same results as analyse(), in order"""
+    sample_files = sorted((Path(__file__).parent / "data").glob("*.txt"))
+
+    results = charsetrs.analyse_many(sample_files)
+
+    assert len(results) == len(sample_files)
+    for sample_file, result in zip(sample_files, results, strict=True):
+        assert result == charsetrs.analyse(sample_file)
+
+
+def test_analyse_many_nonexistent_file():
+    """Test that analyse_many() raises error when any file is missing"""
+    with pytest.raises(FileNotFoundError):
+        charsetrs.analyse_many(["/nonexistent/path/to/file.txt"])
+
+
 # Tests for charsetrs.normalize() function
 
 
@@ -242,6 +470,52 @@ def test_normalize_latin1_to_utf8():
         os.unlink(temp_path)
 
 
+def test_normalize_with_known_source_encoding(tmp_file):
+    """Test normalize() with an explicit source_encoding, skipping detection"""
+    tmp_file.write_bytes("Preço: 10€\r\nCafé\r\n".encode("cp1252"))
+
+    charsetrs.normalize(tmp_file, encoding="utf-8", newlines="LF", source_encoding="cp1252")
+
+    assert tmp_file.read_bytes() == "Preço: 10€\nCafé\n".encode()
+
+
+def test_normalize_cp1252_crlf_to_lf_keeps_encoding(tmp_file):
+    """Test normalizing only the newlines of a Windows-1252 file"""
+    tmp_file.write_bytes("Olá Mundo! Texto em português: ação, não\r\nSão Paulo\r\n".encode("cp1252"))
+
+    charsetrs.normalize(tmp_file, encoding="windows-1252", newlines="LF")
+
+    assert tmp_file.read_bytes() == "Olá Mundo! Texto em português: ação, não\nSão Paulo\n".encode("cp1252")
+
+
+def test_normalize_replaces_invalid_bytes_outside_the_sample(tmp_file):
+    """Test that a newline-only rewrite still replaces malformed bytes detection never saw"""
+    # The 1KB sample of this 204KB file is pure ASCII, so the file is detected as UTF-8, and
+    # offset 150000 lies between two of the sampled middle chunks
+    original = b"Plain text line\n" * 12_750
+    invalid_offset = 150_000
+    original = original[:invalid_offset] + b"\xff" + original[invalid_offset:]
+    tmp_file.write_bytes(original)
+
+    charsetrs.normalize(tmp_file, encoding="utf-8", newlines="CRLF", min_sample_size=1024, percentage_sample_size=0.0)
+
+    expected = original.replace(b"\xff", "�".encode()).replace(b"\n", b"\r\n")
+    assert tmp_file.read_bytes() == expected
+
+
+def test_normalize_ascii_file_to_latin1_is_noop(tmp_file):
+    """Test that pure ASCII files are left untouched when the target is ASCII-compatible"""
+    test_content = b"Plain ASCII text\nLine 2\n"
+    tmp_file.write_bytes(test_content)
+
+    inode_before = tmp_file.stat().st_ino
+    charsetrs.normalize(tmp_file, encoding="latin-1", newlines="LF")
+
+    # The file must not have been rewritten
+    assert tmp_file.stat().st_ino == inode_before
+    assert tmp_file.read_bytes() == test_content
+
+
 def test_normalize_with_max_sample_size():
     """Test normalize() with custom max_sample_size parameter"""
     with tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=".txt") as f:
@@ -1,13 +1,10 @@
 from pathlib import Path
 
 import pytest
-from charset_normalizer import from_path
+from _data import DATA_FILES
 
 import charsetrs
 
-DIR_PATH = Path(__file__).parent.absolute() / "data"
-
-
 # Define charset equivalence groups for ambiguous detections
 # These charsets can be considered equivalent for certain files
 CHARSET_EQUIVALENCE = {
@@ -36,19 +33,19 @@ def are_charsets_equivalent(charset1: str, charset2: str) -> bool:
     return False
 
 
-@pytest.mark.parametrize("file_path", [p.absolute() for p in DIR_PATH.glob("*")])
-def test_elementary_detection(
-    file_path: Path,
-):
-    expected = from_path(file_path.as_posix())
-    expected_best = expected.best()
-    if expected_best is None:
+@pytest.mark.parametrize("file_path", DATA_FILES)
+def test_elementary_detection(file_path: Path, expected_charset):
+    expected = expected_charset(file_path)
+    if expected is None:
         pytest.skip(f"No charset detected by charset_normalizer for {file_path}")
-    expected_charset = expected_best.encoding
-
-    result = charsetrs.analyse(file_path.as_posix())
-    detected_charset = result.encoding
 
-    assert are_charsets_equivalent(detected_charset, expected_charset), (  # noqa: S101
-        f"Expected charset {expected_charset}, got {detected_charset} for file {file_path}"
-    )
+    # Both public detectors are checked against the one baseline computed for this file
+    results = {
+        "analyse": charsetrs.analyse(file_path.as_posix()),
+        "analyse_many": charsetrs.analyse_many([file_path.as_posix()])[0],
+    }
+    for detector, result in results.items():
+        detected_charset = result.encoding
+        assert are_charsets_equivalent(detected_charset, expected), (  # noqa: S101
+            f"Expected charset {expected}, got {detected_charset} from {detector} for file {file_path}"
+        )